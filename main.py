@@ -1,20 +1,32 @@
 # /// script
-# dependencies = ["marvin", "prefect", "raggy[tpuf]"]
+# dependencies = ["httpx", "marvin", "numpy", "prefect", "raggy[tpuf]"]
 # ///
 
 """An assistant that proofs out Prefect usage by running commands in a Docker container."""
 
-import asyncio
 import subprocess
+import time
 
+import httpx
 import marvin
 from marvin.beta.applications import Application
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from raggy.vectorstores.tpuf import TurboPuffer
 
 from mounted_filesystem import MountedDockerSandbox
+from research_cache import ResearchCache, embed_batch
 
-CLASSIFY_MODEL = EXTRACT_MODEL = "gpt-4o-2024-11-20"
+EXTRACT_MODEL = "gpt-4o-2024-11-20"
+PREFECT_API_HEALTH_URL = "http://127.0.0.1:4200/api/health"
+
+research_cache = ResearchCache()
+
+
+def prefect_server_running() -> bool:
+    try:
+        return httpx.get(PREFECT_API_HEALTH_URL, timeout=0.25).is_success
+    except httpx.HTTPError:
+        return False
 
 
 class ExecutiveSummary(BaseModel):
@@ -22,6 +34,13 @@ class ExecutiveSummary(BaseModel):
     main_points: list[str] = Field(default_factory=list, description="key takeaways")
 
 
+class ResearchResult(BaseModel):
+    most_relevant_excerpt: str = Field(
+        description="the excerpt most relevant to the query"
+    )
+    summary: ExecutiveSummary
+
+
 class Knapsack(MountedDockerSandbox):
     """Curated state useful for performing topic-related tasks.
 
@@ -43,6 +62,15 @@ class Knapsack(MountedDockerSandbox):
 
     vector_namespace: str = Field(default="marvin-slackbot")
 
+    _tpuf: TurboPuffer | None = PrivateAttr(default=None)
+
+    @property
+    def tpuf(self) -> TurboPuffer:
+        # reuse one client (and its HTTP connection) across research calls
+        if self._tpuf is None:
+            self._tpuf = TurboPuffer(namespace=self.vector_namespace)
+        return self._tpuf
+
     async def research_a_topic(self, query: str, n_documents: int = 3) -> str:
         """Research a prefect-related concept. MUST be used before writing any code.
 
@@ -50,32 +78,47 @@ class Knapsack(MountedDockerSandbox):
         "how to write a prefect task"
         >>> research_a_topic("how to write a prefect task")
         """
-        with TurboPuffer(namespace=self.vector_namespace) as tpuf:
-            vector_result = tpuf.query(
-                text=query,
-                top_k=n_documents,
-            )
-            documents = [
-                str(row.attributes["text"])
-                for row in (vector_result.data or [])
-                if (row and row.attributes and row.attributes["text"])
-            ]
-
-        most_relevant_excerpt, summaries = await asyncio.gather(  # type: ignore
-            marvin.classify_async(
-                data=f"here are the {self.notes=!r}\n\n and the query: {query}",
-                labels=documents,
-                model_kwargs={"model": CLASSIFY_MODEL},
-            ),
-            marvin.extract_async(
-                data="\n".join(documents),
-                model_kwargs={"model": EXTRACT_MODEL},
-                target=ExecutiveSummary,
-                instructions=f"given the following {self.notes=!r}\n\nsummarize documents related to: {query}",
+        cache_key = (query, n_documents, self.vector_namespace)
+        if (cached := research_cache.get_exact(cache_key)) is not None:
+            return cached
+        if (cached := await research_cache.get_semantic(cache_key)) is not None:
+            return cached
+
+        vector_result = self.tpuf.query(
+            text=query,
+            top_k=n_documents,
+        )
+        documents = [
+            str(row.attributes["text"])
+            for row in (vector_result.data or [])
+            if (row and row.attributes and row.attributes["text"])
+        ]
+
+        if len(documents) > 1:
+            # one batched embedding call; drop near-duplicate excerpts so both
+            # marvin calls below only ingest each passage once
+            doc_vectors = await embed_batch(documents)
+            kept: list[int] = []
+            for i in range(len(documents)):
+                if all(doc_vectors[i] @ doc_vectors[j] < 0.97 for j in kept):
+                    kept.append(i)
+            documents = [documents[i] for i in kept]
+
+        # one fused LLM call: the excerpt pick and the summary share the same
+        # documents, so two round trips here were pure overhead
+        research = await marvin.cast_async(
+            data="\n".join(documents),
+            model_kwargs={"model": EXTRACT_MODEL},
+            target=ResearchResult,
+            instructions=(
+                f"given the following {self.notes=!r}\n\npick the excerpt most "
+                f"relevant to {query!r} and summarize the documents related to it"
             ),
         )
 
-        return f"Relevant excerpt: {most_relevant_excerpt}\n\nSummaries: {summaries}"
+        result = f"Relevant excerpt: {research.most_relevant_excerpt}\n\nSummaries: {research.summary}"
+        await research_cache.put(cache_key, result)
+        return result
 
 
 if __name__ == "__main__":
@@ -113,8 +156,17 @@ if __name__ == "__main__":
             ],
         ) as app
     ):
+        started_server = False
         try:
-            subprocess.run("prefect server start --background".split())
+            # reuse an already-running server (common when iterating) rather
+            # than paying the multi-second startup every session
+            if not prefect_server_running():
+                subprocess.Popen(["prefect", "server", "start", "--background"])
+                started_server = True
+                deadline = time.monotonic() + 30
+                while time.monotonic() < deadline and not prefect_server_running():
+                    time.sleep(0.1)
             app.chat(initial_message="write and run a basic flow")
         finally:
-            subprocess.run("prefect server stop".split())
+            if started_server:
+                subprocess.run(["prefect", "server", "stop"])
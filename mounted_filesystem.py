@@ -1,18 +1,47 @@
+import atexit
+import fnmatch
+import functools
+import hashlib
+import os
+import re
+import shlex
+import tempfile
+import threading
 import time
 from pathlib import Path
-from typing import Self
+from typing import ClassVar, Self
 
 import docker
 import docker.errors
-from pydantic import BaseModel, Field, model_validator
+from docker.models.containers import Container
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, model_validator
+
+WARM_CONTAINER_NAME = "prefect-sandbox-warm"
+MAX_COMMAND_OUTPUT_BYTES = 256 * 1024  # plenty for an LLM context window
+
+
+@functools.lru_cache(maxsize=16)
+def _matcher(pattern: str):
+    """Compiled matcher for a glob pattern; agents reuse the same few patterns."""
+    return re.compile(fnmatch.translate(pattern)).match
 
 
 class MountedDockerSandbox(BaseModel):
     """Interface to mount a container on some host scratchpad directory."""
 
-    scratchpad: Path = Field(
-        default=Path.cwd() / "scratchpad",
-        description="A directory to store custom Python functions.",
+    # keep validation a construction-time-only cost: field writes (notes,
+    # topics, the scratchpad promotion) happen on tool hot paths and should
+    # not re-run validators, nor should passing the model around revalidate it
+    model_config = ConfigDict(
+        extra="forbid",
+        validate_assignment=False,
+        revalidate_instances="never",
+    )
+
+    scratchpad: Path | None = Field(
+        default=None,
+        description="A directory to store custom Python functions. "
+        "Defaults to ./scratchpad at construction time.",
     )
 
     docker_images: list[str] = Field(
@@ -20,14 +49,37 @@ class MountedDockerSandbox(BaseModel):
         min_length=1,
     )
 
+    pause_between_commands: bool = Field(
+        default=False,
+        description="Pause the warm container between commands for isolation.",
+    )
+
+    # images verified (or built) once per process; instances share the set
+    _verified_images: ClassVar[set[str]] = set()
+
+    _pool: dict[str, Container] = PrivateAttr(default_factory=dict)
+    _docker_client: docker.DockerClient | None = PrivateAttr(default=None)
+    _docker_ready_event: threading.Event = PrivateAttr(default_factory=threading.Event)
+    _docker_error: Exception | None = PrivateAttr(default=None)
+    _prewarm_thread: threading.Thread | None = PrivateAttr(default=None)
+    _script_names: set[str] = PrivateAttr(default_factory=set)
+    _script_names_dirty: bool = PrivateAttr(default=True)
+    _volumes: dict[str, dict[str, str]] = PrivateAttr(default_factory=dict)
+    _service_volumes: dict[str, dict[str, str]] = PrivateAttr(default_factory=dict)
+
     @property
     def docker_client(self) -> docker.DockerClient:
-        return docker.from_env()
+        # one client per sandbox: from_env re-reads the environment and opens
+        # a fresh connection to the daemon socket on every call
+        if self._docker_client is None:
+            self._docker_client = docker.from_env()
+        return self._docker_client
 
     @property
     def docker_tools(self) -> list:
         return [
             self.run_command,
+            self.run_commands,
             self.start_background_service,
             self.stop_background_service,
         ]
@@ -44,23 +96,140 @@ class MountedDockerSandbox(BaseModel):
 
     @model_validator(mode="after")
     def ensure_scratchpad_exists(self) -> Self:
-        """Ensure a directory named `path` exists."""
-        if not self.scratchpad.exists():
-            self.scratchpad.parent.mkdir(parents=True, exist_ok=True)
-            self.scratchpad.mkdir()
+        """Ensure a directory named `path` exists and precompute the bind mount.
+
+        Docker readiness is prepared on a background thread so the image
+        check (or build) overlaps the first LLM round trip instead of
+        blocking construction.
+        """
+        # resolved here rather than in the field default, which would bake the
+        # import-time CWD into the class; os.getcwd is one syscall vs Path.cwd
+        self.scratchpad = self.scratchpad or Path(os.getcwd()) / "scratchpad"
+        self.scratchpad.mkdir(parents=True, exist_ok=True)
+        # resolve the bind mounts once instead of re-stringifying per call;
+        # the warm exec containers get rw so the __pycache__ they write
+        # persists across runs, while background services keep the baseline
+        # read-only view of the scratchpad
+        scratchpad_host_path = os.fspath(self.scratchpad.resolve())
+        self._volumes = {
+            scratchpad_host_path: {"bind": "/app/scratchpad", "mode": "rw"}
+        }
+        self._service_volumes = {
+            scratchpad_host_path: {"bind": "/app/scratchpad", "mode": "ro"}
+        }
+        self._start_docker_prewarm()
+        atexit.register(self.close)
         return self
 
-    @model_validator(mode="after")
-    def ensure_docker_image_ready(self) -> Self:
-        """Ensure the Docker image exists. If not, build it from the Dockerfile."""
+    def close(self) -> None:
+        """Stop and remove any pooled sandbox containers."""
+        while self._pool:
+            _, container = self._pool.popitem()
+            try:
+                container.stop()
+                container.remove()
+            except docker.errors.APIError:
+                pass
+
+    def _start_docker_prewarm(self) -> None:
+        if self._prewarm_thread is None:
+            self._prewarm_thread = threading.Thread(
+                target=self._prepare_docker, daemon=True
+            )
+            self._prewarm_thread.start()
+
+    @staticmethod
+    def _image_marker(tag: str) -> Path | None:
+        """Marker file proving `tag` was verified for the current Dockerfile.
+
+        Content-addressed by a blake2b digest of the Dockerfile, so editing it
+        invalidates the marker and forces a real check/build.
+        """
+        dockerfile = Path("Dockerfile")
+        if not dockerfile.exists():
+            return None
+        digest = hashlib.blake2b(dockerfile.read_bytes(), digest_size=8).hexdigest()
+        return Path(tempfile.gettempdir()) / f".prefect-sandbox-{tag}-{digest}.ok"
+
+    def _prepare_docker(self) -> None:
+        """Ensure the image exists (building from the Dockerfile if not) and
+        the warm container is up. Runs on the prewarm thread."""
         try:
-            self.docker_client.images.get(self.docker_images[0])
-        except docker.errors.ImageNotFound:
-            print(
-                f"Docker image {self.docker_images[0]!r} not found locally. Building from Dockerfile..."
+            tag = self.docker_images[0]
+            if tag not in MountedDockerSandbox._verified_images:
+                marker = self._image_marker(tag)
+                if marker is None or not marker.exists():
+                    try:
+                        self.docker_client.images.get(tag)
+                    except docker.errors.ImageNotFound:
+                        print(
+                            f"Docker image {tag!r} not found locally. Building from Dockerfile..."
+                        )
+                        _, logs = self.docker_client.images.build(path=".", tag=tag)
+                        # build logs go to a file so the chat stdout stays clean
+                        (self.scratchpad / "docker-build.log").write_text(
+                            "".join(str(line.get("stream", "")) for line in logs)
+                        )
+                    if marker is not None:
+                        marker.touch()
+                MountedDockerSandbox._verified_images.add(tag)
+            self._get_or_start_warm_container()
+        except Exception as e:
+            self._docker_error = e
+        finally:
+            self._docker_ready_event.set()
+
+    def _ensure_docker_ready(self) -> None:
+        """Block until the prewarm thread has the sandbox ready."""
+        self._start_docker_prewarm()
+        self._docker_ready_event.wait()
+        if self._docker_error is not None:
+            raise self._docker_error
+
+    def _warm_container(self, image: str | None = None) -> Container:
+        """Return a running warm container for `image`, starting one if needed."""
+        image = image or self.docker_images[0]
+        if (container := self._pool.get(image)) is not None:
+            try:
+                container.reload()
+            except docker.errors.NotFound:
+                # removed out from under us (another process exiting runs its
+                # atexit close on the shared name, or a manual docker rm)
+                del self._pool[image]
+            else:
+                if container.status == "running":
+                    return container
+        return self._get_or_start_warm_container(image)
+
+    def _get_or_start_warm_container(self, image: str | None = None) -> Container:
+        """Find or start a long-lived sandbox container that serves `run_command`.
+
+        Keeping one container per image alive and dispatching commands via
+        `docker exec` skips the per-call create/start/teardown cycle, which
+        otherwise dominates latency for short commands.
+        """
+        image = image or self.docker_images[0]
+        name = WARM_CONTAINER_NAME
+        if image != self.docker_images[0]:
+            sanitized = "".join(c if c.isalnum() or c in "_.-" else "-" for c in image)
+            name = f"{WARM_CONTAINER_NAME}-{sanitized}"
+        client = self.docker_client
+        try:
+            container = client.containers.get(name)
+        except docker.errors.NotFound:
+            container = client.containers.run(
+                image,
+                command=["sleep", "infinity"],
+                name=name,
+                detach=True,
+                volumes=self._volumes,
             )
-            self.docker_client.images.build(path=".", tag=self.docker_images[0])
-        return self
+        if container.status == "paused":
+            container.unpause()
+        elif container.status != "running":
+            container.start()
+        self._pool[image] = container
+        return container
 
     def create_or_update_scripts(self, filename: str, body: str) -> str | None:
         """Write or rewrite a file in the scratchpad directory. These may be
@@ -87,8 +256,27 @@ class MountedDockerSandbox(BaseModel):
         """
         try:
             (self.scratchpad / f"{filename}").write_text(body)
+            self._script_names.add(filename)
         except Exception as e:
             return f"Failed to write new helper: {e}"
+        if (
+            filename.endswith(".py")
+            and self._docker_ready_event.is_set()
+            and self._docker_error is None
+        ):
+            # best effort: precompile in the warm container so repeated runs
+            # skip the parse/compile step, which dominates for short scripts.
+            # a failure here must never misreport the successful write above
+            try:
+                container = self._warm_container()
+                container.exec_run(
+                    ["python", "-m", "compileall", "-q", "scratchpad"],
+                    workdir="/app",
+                )
+                if self.pause_between_commands:
+                    container.pause()
+            except Exception:
+                pass
 
     def delete_script(self, filename: str) -> str | None:
         """Delete a file from the scratchpad directory.
@@ -99,12 +287,33 @@ class MountedDockerSandbox(BaseModel):
         """
         try:
             (self.scratchpad / f"{filename}").unlink()
+            self._script_names.discard(filename)
         except Exception as e:
             return f"Failed to delete helper: {e}"
 
+    def _scan_scripts(self) -> set[str]:
+        # recursive os.scandir beats rglob: no per-entry Path objects, and
+        # DirEntry caches the stat results the is_dir/is_file checks need
+        names: set[str] = set()
+        stack = [str(self.scratchpad)]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        names.add(entry.name)
+        return names
+
     def list_scripts(self, pattern: str = "*.py") -> list[str]:
         """List the names of all files in the scratchpad directory that match a pattern."""
-        return [file.name for file in self.scratchpad.rglob(pattern)]
+        # the set mirror is kept in sync by the scripting tools, so this only
+        # rescans disk after a command that may have mutated the scratchpad
+        if self._script_names_dirty:
+            self._script_names = self._scan_scripts()
+            self._script_names_dirty = False
+        match = _matcher(pattern)
+        return sorted(name for name in self._script_names if match(name))
 
     def start_background_service(
         self, command: str, max_retries: int = 3, retry_interval: int = 2
@@ -116,32 +325,39 @@ class MountedDockerSandbox(BaseModel):
         >>> start_background_service("python scratchpad/eth_price_checker.py") # runs blocking script
         """
         try:
+            self._ensure_docker_ready()
+            launched_at = time.time()
             container = self.docker_client.containers.run(
                 self.docker_images[0],
                 command,
-                volumes={
-                    str(self.scratchpad.absolute()): {
-                        "bind": "/app/scratchpad",
-                        "mode": "ro",
-                    }
-                },
+                volumes=self._service_volumes,
                 detach=True,
             )
 
-            # Wait for the container to start and check its status
-            retry_count = 0
-            while retry_count < max_retries:
+            # run(detach=True) returns once the daemon has started the
+            # container, so a single status check usually settles it
+            container.reload()
+            if container.status != "running":
+                # block on the events stream for one small push notification
+                # instead of polling full inspect payloads; note the start
+                # event may already have fired and merely be replayed here,
+                # so it is only a wakeup, not proof the service is up
+                for _ in self.docker_client.events(
+                    since=int(launched_at),
+                    until=int(launched_at) + max_retries * retry_interval,
+                    filters={"container": container.id, "event": "start"},
+                    decode=True,
+                ):
+                    break
                 container.reload()
-                if container.status == "running":
-                    return f"Service started successfully with container ID: {container.id}"
 
-                retry_count += 1
-                time.sleep(retry_interval)
+            if container.status == "running":
+                return f"Service started successfully with container ID: {container.id}"
 
-            # If the container is not running after max retries, stop and remove it
+            # not running by the deadline (or already dead); stop and remove it
             container.stop()
             container.remove()
-            return f"Failed to start background service after {max_retries} retries"
+            return f"Failed to start background service within {max_retries * retry_interval} seconds"
 
         except Exception as e:
             return f"Failed to start background service: {e}"
@@ -168,7 +384,13 @@ class MountedDockerSandbox(BaseModel):
         except Exception as e:
             return f"Failed to stop background service: {e}"
 
-    def run_command(self, command: list[str], image: str | None = None) -> str:
+    def run_command(
+        self,
+        command: list[str],
+        image: str | None = None,
+        tail: int | None = None,
+        decode: bool = True,
+    ) -> str | bytes:
         """Run any linux command (including Python scripts) in a sandboxed
         docker container with Prefect installed. All paths are RELATIVE to repo root.
         NEVER use absolute paths.
@@ -184,23 +406,77 @@ class MountedDockerSandbox(BaseModel):
 
             >>> run_command(["prefect", "version"]) # check Prefect version
 
-            >>> run_command(["prefect", "flow-run", "ls"]) # list all flow runs
+            >>> run_command(["prefect", "flow-run", "ls"], tail=20) # just the last 20 lines
 
         Returns:
-            str: The output of the executed command.
+            str | bytes: The output of the executed command (the last `tail`
+                lines if given); raw bytes when `decode=False`.
         """
         try:
-            result = self.docker_client.containers.run(
-                image or self.docker_images[0],
-                command,
-                volumes={
-                    str(self.scratchpad.absolute()): {
-                        "bind": "/app/scratchpad",
-                        "mode": "ro",
-                    }
-                },
-                remove=True,
+            self._ensure_docker_ready()
+            # the scratchpad mount is rw, so any command may write to it
+            # (e.g. a scratchpad script creating files); a rescan is cheap
+            # next to the Docker round trip we just paid
+            self._script_names_dirty = True
+            container = self._warm_container(image)
+            # stream into a capped bytearray; tail-slicing and decoding (if
+            # requested at all) happen once, on the bytes that survive
+            result = container.exec_run(
+                command, workdir="/app", demux=False, stream=True
             )
-            return result.decode("utf-8")
+            buffer = bytearray()
+            truncated = False
+            for chunk in result.output:
+                buffer += chunk
+                if len(buffer) >= MAX_COMMAND_OUTPUT_BYTES:
+                    del buffer[MAX_COMMAND_OUTPUT_BYTES:]
+                    truncated = True
+                    break
+            # breaking out of the stream must not leak the attached socket
+            result.output.close()
+            if self.pause_between_commands:
+                container.pause()
+            output = bytes(buffer)
+            if tail is not None:
+                # tail -n semantics: a trailing newline doesn't count as a line
+                content, newline = (
+                    (output[:-1], b"\n") if output.endswith(b"\n") else (output, b"")
+                )
+                output = b"\n".join(content.split(b"\n")[-tail:]) + newline
+            if not decode:
+                return output
+            text = output.decode("utf-8", errors="replace")
+            return text + "\n... [output truncated]" if truncated else text
         except Exception as e:
             return f"Failed to run Python file: {e}"
+
+    def run_commands(
+        self, commands: list[list[str]], image: str | None = None
+    ) -> list[str]:
+        """Run several commands in ONE sandboxed round trip. Prefer this over
+        repeated `run_command` calls when the commands are independent - N
+        commands cost a single Docker API call instead of N.
+
+        Example:
+            >>> run_commands([["prefect", "version"], ["ls", "-l", "scratchpad"]])
+
+        Returns:
+            list[str]: One output per command, in order.
+        """
+        separator = "__COMMAND_SEPARATOR__"
+        try:
+            self._ensure_docker_ready()
+            self._script_names_dirty = True
+            script = f"; echo {separator}; ".join(shlex.join(c) for c in commands)
+            container = self._warm_container(image)
+            _, output = container.exec_run(
+                ["sh", "-c", script], workdir="/app", demux=False
+            )
+            if self.pause_between_commands:
+                container.pause()
+            return [
+                piece.strip("\n")
+                for piece in output.decode("utf-8", errors="replace").split(separator)
+            ]
+        except Exception as e:
+            return [f"Failed to run commands: {e}"]
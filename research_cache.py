@@ -0,0 +1,178 @@
+"""A two-level cache for research results: exact-match LRU + semantic lookup."""
+
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from raggy.utilities.embeddings import create_openai_embeddings
+
+CacheKey = tuple[str, int, str]  # (query, n_documents, namespace)
+
+DEFAULT_DB_PATH = Path.home() / ".cache" / "prefect-bot" / "research.sqlite"
+DEFAULT_TTL = 7 * 24 * 3600  # a week; the docs corpus changes slowly
+
+_query_embeddings: dict[str, np.ndarray] = {}
+_text_embeddings: dict[str, np.ndarray] = {}
+
+
+def _as_unit_vector(embedding: list[float]) -> np.ndarray:
+    vec = np.asarray(embedding, dtype=np.float32)
+    vec /= np.linalg.norm(vec) or 1.0
+    return vec
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+async def embed_batch(texts: list[str]) -> np.ndarray:
+    """Embed texts as one batched API call, skipping any already cached."""
+    missing = [t for t in dict.fromkeys(texts) if _text_key(t) not in _text_embeddings]
+    if missing:
+        for text, embedding in zip(missing, await create_openai_embeddings(missing)):
+            _text_embeddings[_text_key(text)] = _as_unit_vector(embedding)
+    return np.stack([_text_embeddings[_text_key(t)] for t in texts])
+
+
+async def embed_query(query: str) -> np.ndarray:
+    """Embed a query once and reuse the unit vector on subsequent calls."""
+    if (vec := _query_embeddings.get(query)) is None:
+        vec = _query_embeddings[query] = _as_unit_vector(
+            await create_openai_embeddings(query)
+        )
+    return vec
+
+
+class ResearchCache:
+    """LRU cache of research results with a semantic fallback.
+
+    Lookups first try an exact match on `(query, n_documents, namespace)`;
+    failing that, the query embedding is compared against all cached query
+    embeddings and any prior result above `similarity_threshold` cosine
+    similarity (for the same `n_documents`/`namespace`) is reused.
+
+    Entries are mirrored to a SQLite file (unless `db_path=None`) so restarts
+    warm-start from prior sessions; rows older than `ttl` seconds are dropped.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        similarity_threshold: float = 0.95,
+        db_path: Path | None = DEFAULT_DB_PATH,
+        ttl: float = DEFAULT_TTL,
+    ):
+        self.maxsize = maxsize
+        self.similarity_threshold = similarity_threshold
+        self._results: OrderedDict[CacheKey, str] = OrderedDict()
+        self._keys: list[CacheKey] = []
+        # query vectors are stored int8-quantized per row (with a float32
+        # scale each): 4x less memory traffic in the similarity scan, and
+        # well within tolerance for a 0.95 cosine threshold
+        self._vectors: np.ndarray | None = None  # (N, D) int8
+        self._scales: np.ndarray | None = None  # (N,) float32
+        self._db: sqlite3.Connection | None = None
+        if db_path is not None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS research ("
+                " query_text TEXT, n_documents INTEGER, namespace TEXT,"
+                " query_vec BLOB, result TEXT, created_at REAL,"
+                " PRIMARY KEY (query_text, n_documents, namespace))"
+            )
+            self._db.execute(
+                "DELETE FROM research WHERE created_at < ?", (time.time() - ttl,)
+            )
+            self._db.commit()
+            self._load()
+
+    def _load(self) -> None:
+        assert self._db is not None
+        # newest first: the DB is only TTL-pruned, so once it outgrows
+        # maxsize we want to warm-start from the most recent results
+        rows = self._db.execute(
+            "SELECT query_text, n_documents, namespace, query_vec, result"
+            " FROM research ORDER BY created_at DESC LIMIT ?",
+            (self.maxsize,),
+        ).fetchall()
+        if not rows:
+            return
+        # insert oldest-to-newest so LRU eviction drops the oldest first
+        for query_text, n_documents, namespace, query_vec, result in reversed(rows):
+            vec = np.frombuffer(query_vec, dtype=np.float32)
+            _query_embeddings.setdefault(query_text, vec)
+            self._keys.append((query_text, n_documents, namespace))
+            self._results[self._keys[-1]] = result
+            self._append_vector(vec)
+
+    def invalidate(self, namespace: str) -> None:
+        """Drop all cached results for a namespace (e.g. after re-ingestion)."""
+        keep = [i for i, key in enumerate(self._keys) if key[2] != namespace]
+        self._keys = [self._keys[i] for i in keep]
+        if self._vectors is not None:
+            self._vectors = self._vectors[keep] if keep else None
+            self._scales = self._scales[keep] if keep else None
+        self._results = OrderedDict(
+            (key, result) for key, result in self._results.items()
+            if key[2] != namespace
+        )
+        if self._db is not None:
+            self._db.execute("DELETE FROM research WHERE namespace = ?", (namespace,))
+            self._db.commit()
+
+    def get_exact(self, key: CacheKey) -> str | None:
+        if (result := self._results.get(key)) is not None:
+            self._results.move_to_end(key)
+        return result
+
+    def _append_vector(self, vec: np.ndarray) -> None:
+        scale = np.float32(np.abs(vec).max() / 127 or 1.0)
+        row = np.round(vec / scale).astype(np.int8)[None, :]
+        if self._vectors is None:
+            self._vectors = row
+            self._scales = np.array([scale], dtype=np.float32)
+        else:
+            self._vectors = np.vstack([self._vectors, row])
+            self._scales = np.append(self._scales, scale)
+
+    async def get_semantic(self, key: CacheKey) -> str | None:
+        if self._vectors is None:
+            return None
+        # only rows for the same (n_documents, namespace) are candidates; a
+        # global argmax could land on another namespace's entry and shadow a
+        # perfectly good match
+        eligible = [i for i, cached in enumerate(self._keys) if cached[1:] == key[1:]]
+        if not eligible:
+            return None
+        # dequantize inside the dot product: numpy fuses the scale multiply
+        similarities = (
+            self._vectors[eligible].astype(np.float32) @ await embed_query(key[0])
+        ) * self._scales[eligible]
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            return self.get_exact(self._keys[eligible[best]])
+        return None
+
+    async def put(self, key: CacheKey, result: str) -> None:
+        vec = await embed_query(key[0])
+        if key not in self._results:
+            self._keys.append(key)
+            self._append_vector(vec)
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO research VALUES (?, ?, ?, ?, ?, ?)",
+                (key[0], key[1], key[2], vec.tobytes(), result, time.time()),
+            )
+            self._db.commit()
+        while len(self._results) > self.maxsize:
+            evicted, _ = self._results.popitem(last=False)
+            index = self._keys.index(evicted)
+            del self._keys[index]
+            self._vectors = np.delete(self._vectors, index, axis=0)
+            self._scales = np.delete(self._scales, index)
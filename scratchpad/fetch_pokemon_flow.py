@@ -0,0 +1,47 @@
+"""Fetch Pokémon names from PokéAPI in batches and count them."""
+
+import asyncio
+import atexit
+
+import httpx
+import orjson  # ships with prefect; Rust parser, operates on bytes directly
+from prefect import flow, task
+
+# one client for every batch: keep-alive amortizes DNS + TCP + TLS setup
+# over all requests instead of paying it per httpx.get
+_CLIENT = httpx.AsyncClient(
+    base_url="https://pokeapi.co",
+    limits=httpx.Limits(max_keepalive_connections=32),
+)
+atexit.register(lambda: asyncio.run(_CLIENT.aclose()))
+
+
+@task
+async def fetch_pokemon_batch(offset: int, limit: int) -> list[dict]:
+    response = await _CLIENT.get(
+        "/api/v2/pokemon",
+        params={"offset": offset, "limit": limit},
+    )
+    response.raise_for_status()
+    return orjson.loads(response.content)["results"]
+
+
+@flow
+async def get_pokemon(total: int = 151, batch_size: int = 20) -> list[str]:
+    offsets = range(0, total, batch_size)
+
+    pokemon_names: list[str] = []
+    # batches share one event loop (no worker thread per request) and are
+    # consumed in completion order - peak memory stays at one batch
+    for coro in asyncio.as_completed(
+        fetch_pokemon_batch(offset, min(batch_size, total - offset))
+        for offset in offsets
+    ):
+        pokemon_names.extend(pokemon["name"] for pokemon in await coro)
+
+    print(f"fetched {len(pokemon_names)} pokemon")
+    return pokemon_names
+
+
+if __name__ == "__main__":
+    asyncio.run(get_pokemon())
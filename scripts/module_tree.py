@@ -1,22 +1,53 @@
 """not sure what to do with this yet, but it renders a tree of modules and their functions and classes"""
 
+import functools
 import importlib
 import inspect
 import pkgutil
-from collections import OrderedDict
 from typing import Any
 
+# signatures repeat across modules (re-exports) and are expensive to parse
+_signature = functools.lru_cache(maxsize=None)(inspect.signature)
+
+_SKIP_PREFIXES = ("_", "beta", "cli")
+
+
+def _required_init_params(cls: type) -> list[str]:
+    """Names of the required positional parameters of `cls.__init__`.
+
+    Reads them straight off the code object where possible -
+    inspect.signature resolves annotations, which can trigger typing imports
+    and forward-reference evaluation we'd only throw away.
+    """
+    init = cls.__init__
+    code = getattr(init, "__code__", None)
+    if code is None or hasattr(init, "__wrapped__"):
+        return [
+            param.name
+            for param in _signature(init).parameters.values()
+            if param.name != "self" and param.default == inspect.Parameter.empty
+        ]
+    names = code.co_varnames[1 : code.co_argcount]
+    n_defaults = len(init.__defaults__ or ())
+    return list(names[: len(names) - n_defaults])
+
 
 def get_module_tree(package_name: str) -> dict[str, dict[str, Any]]:
     package = importlib.import_module(package_name)
     package_path = package.__path__[0]
     module_cache: dict[str, Any] = {}
 
-    def walk_package(package_path: str, prefix: str) -> dict[str, dict[str, Any]]:
-        module_tree: dict[str, dict[str, Any]] = OrderedDict()
-        for importer, module_name, ispkg in pkgutil.iter_modules([package_path]):
-            if any(module_name.startswith(p) for p in ["_", "beta", "cli"]):
-                continue  # Skip private modules
+    # iterative DFS over (path, prefix) pairs: plain dicts preserve insertion
+    # order since 3.7 at half the memory of OrderedDict, and the explicit
+    # stack skips a Python frame per subpackage
+    module_tree: dict[str, dict[str, Any]] = {}
+    stack: list[tuple[str, str]] = [(package_path, package_name)]
+    while stack:
+        path, prefix = stack.pop()
+        subpackages: list[tuple[str, str]] = []
+        for _, module_name, ispkg in pkgutil.iter_modules([path]):
+            if module_name.startswith(_SKIP_PREFIXES):
+                continue  # Skip private modules; tuple form runs entirely in C
 
             full_name = f"{prefix}.{module_name}" if prefix else module_name
             if full_name in module_cache:
@@ -28,41 +59,34 @@ def get_module_tree(package_name: str) -> dict[str, dict[str, Any]]:
                 except ImportError:
                     continue
 
-            # Get only public functions and classes defined in the module
-            functions = {
-                name: func
-                for name, func in inspect.getmembers(module, inspect.isfunction)
-                if not name.startswith("_") and func.__module__ == full_name
-            }
-            classes = {
-                name: cls
-                for name, cls in inspect.getmembers(module, inspect.isclass)
-                if not name.startswith("_") and cls.__module__ == full_name
-            }
+            # Get only public functions and classes defined in the module;
+            # one pass over vars() instead of two sorted getmembers sweeps
+            functions: dict[str, Any] = {}
+            classes: dict[str, Any] = {}
+            for name, obj in vars(module).items():
+                if name.startswith("_") or getattr(obj, "__module__", None) != full_name:
+                    continue
+                if inspect.isfunction(obj):
+                    functions[name] = obj
+                elif inspect.isclass(obj):
+                    classes[name] = obj
 
             module_tree[full_name] = {
                 "functions": {
-                    name: str(inspect.signature(func))
-                    for name, func in functions.items()
+                    name: str(_signature(func)) for name, func in functions.items()
                 },
                 "classes": {
-                    name: [
-                        param.name
-                        for param in inspect.signature(cls.__init__).parameters.values()
-                        if param.name != "self"
-                        and param.default == inspect.Parameter.empty
-                    ]
-                    for name, cls in classes.items()
+                    name: _required_init_params(cls) for name, cls in classes.items()
                 },
             }
 
             if ispkg:
-                module_tree.update(
-                    walk_package(f"{package_path}/{module_name}", full_name)
-                )
-        return module_tree
+                subpackages.append((f"{path}/{module_name}", full_name))
+
+        # reversed so the LIFO stack walks subpackages in declaration order
+        stack.extend(reversed(subpackages))
 
-    return walk_package(package_path, package_name)
+    return module_tree
 
 
 def print_module_tree(tree: dict[str, dict[str, Any]], indent: int = 0) -> None: